@@ -1,15 +1,37 @@
+import asyncio
+import hmac
+import logging
 import os
 import json
 import random
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
 
+import msgspec
+import orjson
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
+from sortedcontainers import SortedList
+
+# Optional: vectorized RNG for the mock randomizer. The pure-Python
+# fallback below keeps the backend runnable without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Diagnostics go through the logging module, never print(): print() grabs the
+# stdout lock and formats eagerly on every request, which serializes handlers
+# under load. Guard any DEBUG-level message behind isEnabledFor so production
+# (INFO+) pays nothing for it.
+logger = logging.getLogger(__name__)
 
 # --- Config ---
 origins = ["*"]
@@ -17,15 +39,26 @@ origins = ["*"]
 # API Token for authentication (set via environment variable or use default for dev)
 # In production, set this via: export API_TOKEN="your-secure-token"
 API_TOKEN = os.environ.get("API_TOKEN", "dev-token-change-me")
+_API_TOKEN_BYTES = API_TOKEN.encode("utf-8")  # encoded once for verify_token
 
 # Production mode: disable docs/redoc pages
 # Set ENABLE_DOCS=true to enable them (for development)
 ENABLE_DOCS = os.environ.get("ENABLE_DOCS", "false").lower() == "true"
 
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson's C encoder instead of stdlib json."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
 app = FastAPI(
     title="Online Status API",
     description="API for tracking online/idle/offline status of users",
     version="1.0.0",
+    # orjson encodes responses in C, well faster than stdlib json
+    default_response_class=ORJSONResponse,
     # Disable docs in production
     docs_url="/docs" if ENABLE_DOCS else None,
     redoc_url="/redoc" if ENABLE_DOCS else None,
@@ -44,9 +77,15 @@ security = HTTPBearer()
 
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Verify the Bearer token and return the token if valid."""
+    """Verify the Bearer token and return the token if valid.
+
+    Uses hmac.compare_digest against the pre-encoded token so the
+    comparison is constant-time regardless of where the mismatch is.
+    """
     token = credentials.credentials
-    if token != API_TOKEN:
+    if not hmac.compare_digest(token.encode("utf-8"), _API_TOKEN_BYTES):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rejected request with invalid bearer token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing token",
@@ -70,6 +109,11 @@ RANDOM_SEED = None              # set to an int for deterministic behavior, or N
 # Online timeout in seconds (user is considered offline if no heartbeat for this long)
 ONLINE_TIMEOUT_SECONDS = 300    # 5 minutes
 
+# Shared RNGs for the (unseeded) mock randomizer: constructing a fresh
+# Mersenne Twister per request costs more than the 4-friend workload itself
+_np_rng = np.random.default_rng(RANDOM_SEED) if np is not None else None
+_mock_rng = random.Random()
+
 
 # --- Models ---    
 class Friend(BaseModel):
@@ -77,15 +121,66 @@ class Friend(BaseModel):
     state: str = Field(..., pattern="^(online|offline|idle|busy)$")
     last_seen: str
 
-class HeartbeatRequest(BaseModel):
-    """Heartbeat request from frontend client."""
-    uuid: str = Field(..., description="Unique client identifier")
-    name: str = Field(..., description="Display name of the user")
-    activity_state: str = Field(
-        default="online",
-        pattern="^(online|idle|busy|unknown)$",
-        description="User activity state: online (active), idle (AFK), busy (fullscreen/gaming), unknown"
-    )
+class HeartbeatRequest(msgspec.Struct):
+    """Heartbeat request from frontend client.
+
+    Decoded with msgspec instead of pydantic: heartbeats are the highest
+    volume POST and msgspec parses + validates the body in C without
+    per-field Python validators.
+    """
+    uuid: str                        # unique client identifier
+    name: str                        # display name of the user
+    activity_state: str = "online"   # online (active), idle (AFK), busy (fullscreen/gaming), unknown
+
+
+# Allowed values for HeartbeatRequest.activity_state (checked by hand,
+# replacing the old pydantic regex field)
+_ALLOWED_ACTIVITY_STATES = frozenset({"online", "idle", "busy", "unknown"})
+
+_heartbeat_decoder = msgspec.json.Decoder(HeartbeatRequest)
+
+
+class HeartbeatBatch(msgspec.Struct):
+    """A list of heartbeats sent in one request (see /heartbeat/batch/)."""
+    items: List[HeartbeatRequest]
+
+
+_heartbeat_batch_decoder = msgspec.json.Decoder(HeartbeatBatch)
+
+
+def _check_activity_state(heartbeat: HeartbeatRequest) -> HeartbeatRequest:
+    if heartbeat.activity_state not in _ALLOWED_ACTIVITY_STATES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"activity_state must be one of {sorted(_ALLOWED_ACTIVITY_STATES)}",
+        )
+    return heartbeat
+
+
+def _decode_heartbeat(body: bytes) -> HeartbeatRequest:
+    """Decode and validate a heartbeat body, raising 422 on bad input."""
+    try:
+        heartbeat = _heartbeat_decoder.decode(body)
+    except msgspec.DecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        )
+    return _check_activity_state(heartbeat)
+
+
+def _decode_heartbeat_batch(body: bytes) -> List[HeartbeatRequest]:
+    """Decode and validate a heartbeat batch body, raising 422 on bad input."""
+    try:
+        batch = _heartbeat_batch_decoder.decode(body)
+    except msgspec.DecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        )
+    for heartbeat in batch.items:
+        _check_activity_state(heartbeat)
+    return batch.items
 
 class HeartbeatResponse(BaseModel):
     """Response to heartbeat request."""
@@ -109,8 +204,76 @@ def generate_initial_friends() -> List[dict]:
 
 MOCK_FRIENDS = generate_initial_friends()
 
-# Real user heartbeats: {uuid: {"name": str, "last_seen": datetime}}
-USER_HEARTBEATS: Dict[str, dict] = {}
+# When mock mode serves a constant list (RANDOMIZE_ON_FETCH=False) the
+# payload never changes, so it is serialized once and returned verbatim.
+# Built lazily so runtime toggling of the flags stays possible.
+_mock_body: Optional[bytes] = None
+
+@dataclass(slots=True)
+class HBEntry:
+    """One user's heartbeat record.
+
+    Slotted: with many users this is several times smaller than a dict per
+    user and attribute access skips the per-lookup hashing.
+    """
+    name: str
+    last_seen_ts: float
+    last_seen_iso: str
+    activity_state: str
+
+
+# Real user heartbeats.
+#
+# Concurrency model: single writer, many readers. All mutations of
+# USER_HEARTBEATS and its indexes happen on the event loop (endpoints and
+# the pruning coroutine below), so no locking is needed; anything moved to
+# a thread via _offload must treat these structures as read-only snapshots.
+USER_HEARTBEATS: Dict[str, HBEntry] = {}
+
+# Entries with no heartbeat for this long get dropped by the pruner so the
+# store does not grow with every uuid ever seen
+_PRUNE_AFTER_SECONDS = 24 * 60 * 60
+_PRUNE_INTERVAL_SECONDS = 60
+
+# Optional shared store: set REDIS_URL (e.g. redis://localhost:6379/0) to back
+# heartbeats with Redis so every uvicorn worker sees the same state and it
+# survives restarts. Heartbeats live in one hash per user ("hb:<uuid>") plus a
+# sorted set by last_seen_ts ("hb:last_seen"). When unset, the per-process
+# in-memory store above is used and the debug endpoints keep working; in Redis
+# mode the debug endpoints still only see the local process.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    _redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+else:
+    _redis = None
+
+# (name_lower, uuid) tuples kept sorted on write so the status list never
+# has to sort per request. Names rarely change; reads vastly outnumber the
+# occasional remove+re-add this costs on a rename.
+_name_index: SortedList = SortedList()
+
+# (last_seen_ts, uuid) tuples kept sorted on write. Lets the status read
+# find the currently-active set with one range query instead of computing
+# elapsed time for every user ever seen.
+_last_seen_index: SortedList = SortedList()
+
+# Short-lived cache of the serialized /online_status/ payload so a burst of
+# polling clients shares one list build + JSON encode per window. State only
+# changes on heartbeat writes (which invalidate) or with the passage of time,
+# so a sub-second TTL is invisible to clients polling every few seconds.
+#
+# The cache is published RCU-style as one immutable (expiry, bytes) tuple
+# swapped in a single reference assignment: readers bind the tuple once and
+# can never observe a fresh expiry paired with stale bytes, and no lock is
+# needed even if threadpool code ends up reading it.
+_STATUS_CACHE_TTL = 0.5  # seconds
+_status_snapshot = (0.0, b"")  # (monotonic expiry, serialized payload)
+
+
+def _invalidate_status_cache():
+    global _status_snapshot
+    _status_snapshot = (0.0, b"")
 
 
 # --- Helper functions ---
@@ -119,26 +282,143 @@ def _now_iso():
     return datetime.utcnow().isoformat() + "Z"
 
 
+def _classify(last_seen_ts: float, activity_state: str, now_ts: float) -> str:
+    """Map a heartbeat timestamp + raw activity to the effective state.
+
+    Shared by every read path so the classification can never diverge:
+    - "offline": no heartbeat within ONLINE_TIMEOUT_SECONDS
+    - "busy"/"idle": recent heartbeat, as reported by the client
+    - "online": recent heartbeat, active
+    """
+    if now_ts - last_seen_ts >= ONLINE_TIMEOUT_SECONDS:
+        return "offline"
+    if activity_state == "busy":
+        return "busy"
+    if activity_state == "idle":
+        return "idle"
+    return "online"
+
+
+async def _offload(fn, *args, **kwargs):
+    """Run a blocking function on the threadpool instead of the event loop.
+
+    All endpoints are `async def` and currently only touch in-memory dicts,
+    which is fine. Anything slower than that (disk, DB drivers, heavy CPU
+    work like randomizing a very large friends list) must go through this
+    helper, otherwise it blocks every other request.
+    """
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def _redis_queue_heartbeat(pipe, uuid: str, name: str, activity_state: str, now_ts: float, now_iso: str) -> None:
+    """Queue one heartbeat write (hash per user + last_seen sorted set) on a pipeline."""
+    pipe.hset(f"hb:{uuid}", mapping={
+        "name": name,
+        "last_seen_ts": now_ts,
+        "last_seen_iso": now_iso,
+        "activity_state": activity_state,
+    })
+    pipe.zadd("hb:last_seen", {uuid: now_ts})
+
+
+async def _redis_friends_list() -> List[dict]:
+    """Build the friends list from Redis; same shape as get_real_friends_list."""
+    now_ts = time.time()
+    uuids = await _redis.zrange("hb:last_seen", 0, -1)
+    if not uuids:
+        return []
+    pipe = _redis.pipeline(transaction=False)
+    for uuid in uuids:
+        pipe.hgetall(f"hb:{uuid}")
+    rows = await pipe.execute()
+
+    friends = []
+    for uuid, data in zip(uuids, rows):
+        if not data:
+            continue  # hash expired/deleted after the zrange
+        activity_state = data.get("activity_state", "online")
+        state = _classify(float(data["last_seen_ts"]), activity_state, now_ts)
+        friends.append({
+            "uuid": uuid,
+            "name": data["name"],
+            "state": state,
+            "activity_state": activity_state,
+            "last_seen": data["last_seen_iso"],
+        })
+    friends.sort(key=lambda f: f["name"].lower())
+    return friends
+
+
+def _store_heartbeat(uuid: str, name: str, activity_state: str, now_ts: float, now_iso: str) -> None:
+    """Record one heartbeat, keeping USER_HEARTBEATS and _name_index in sync.
+
+    Unchanged heartbeats just bump the timestamps on the existing record;
+    a new record (or a rename) also updates the sorted name index.
+    """
+    prev = USER_HEARTBEATS.get(uuid)
+    if prev is not None:
+        _last_seen_index.remove((prev.last_seen_ts, uuid))
+    _last_seen_index.add((now_ts, uuid))
+    if prev is not None and prev.name == name and prev.activity_state == activity_state:
+        prev.last_seen_ts = now_ts
+        prev.last_seen_iso = now_iso
+        return
+    if prev is None:
+        _name_index.add((name.lower(), uuid))
+    elif prev.name != name:
+        _name_index.remove((prev.name.lower(), uuid))
+        _name_index.add((name.lower(), uuid))
+    USER_HEARTBEATS[uuid] = HBEntry(name, now_ts, now_iso, activity_state)
+
+
+def _touch_last_seen(uuid: str, new_ts: float) -> None:
+    """Rewrite a user's timestamp (debug paths), keeping _last_seen_index in sync."""
+    entry = USER_HEARTBEATS[uuid]
+    _last_seen_index.remove((entry.last_seen_ts, uuid))
+    _last_seen_index.add((new_ts, uuid))
+    entry.last_seen_ts = new_ts
+    entry.last_seen_iso = datetime.utcfromtimestamp(new_ts).isoformat() + "Z"
+
+
 def randomize_friends(current: List[dict], flip_probability: float = 0.5, seed: Optional[int] = None) -> List[dict]:
     """Randomly flip online/offline for some friends and update last_seen accordingly.
 
+    Mutates the entries of `current` in place (and returns it) so the mock
+    endpoint does not allocate a fresh list of dicts on every request.
     If seed is provided, randomness is deterministic.
     """
     # clamp probability
     p = max(0.0, min(1.0, float(flip_probability)))
-    rng = random.Random(seed)
-    out = [dict(m) for m in current]
-    for i in range(len(out)):
+    now = datetime.utcnow()
+    now_iso = now.isoformat() + "Z"
+
+    if np is not None:
+        # Draw all flip decisions and minute offsets in two C-level calls
+        # instead of two Python RNG calls per friend.
+        rng = _np_rng if seed is None else np.random.default_rng(seed)
+        n = len(current)
+        flips = rng.random(n) < p
+        minutes = rng.integers(1, 61, size=n)
+        for i in np.flatnonzero(flips):
+            row = current[i]
+            if row.get("state") == "online":
+                row["state"] = "offline"
+                row["last_seen"] = (now - timedelta(minutes=int(minutes[i]))).isoformat() + "Z"
+            else:
+                row["state"] = "online"
+                row["last_seen"] = now_iso
+        return current
+
+    rng = _mock_rng if seed is None else random.Random(seed)
+    for row in current:
         if rng.random() < p:
-            was_online = out[i].get("state") == "online"
-            if was_online:
-                out[i]["state"] = "offline"
-                minutes_ago = rng.randint(1, 60)
-                out[i]["last_seen"] = (datetime.utcnow() - timedelta(minutes=minutes_ago)).isoformat() + "Z"
+            if row.get("state") == "online":
+                row["state"] = "offline"
+                row["last_seen"] = (now - timedelta(minutes=rng.randint(1, 60))).isoformat() + "Z"
             else:
-                out[i]["state"] = "online"
-                out[i]["last_seen"] = datetime.utcnow().isoformat() + "Z"
-    return out
+                row["state"] = "online"
+                row["last_seen"] = now_iso
+    return current
 
 
 def get_real_friends_list() -> List[dict]:
@@ -151,39 +431,62 @@ def get_real_friends_list() -> List[dict]:
     - "busy": In fullscreen app (gaming, movie) but recent heartbeat
     - "offline": No recent heartbeat
     """
-    now = datetime.utcnow()
+    now_ts = time.time()
+    # One range query over the last_seen index finds everyone with a
+    # recent-enough heartbeat; the rest are offline without computing
+    # per-user elapsed times.
+    cutoff = now_ts - ONLINE_TIMEOUT_SECONDS
+    active = {uuid for _ts, uuid in _last_seen_index.irange((cutoff,))}
     friends = []
-    for uuid, data in USER_HEARTBEATS.items():
-        last_seen: datetime = data["last_seen"]
-        elapsed = (now - last_seen).total_seconds()
-        activity_state = data.get("activity_state", "online")
+    for _name_lower, uuid in _name_index:
+        data = USER_HEARTBEATS[uuid]
+        activity_state = data.activity_state
 
-        # Determine final state
-        if elapsed >= ONLINE_TIMEOUT_SECONDS:
+        # Determine final state (active set already resolved offline-ness)
+        if uuid not in active:
             state = "offline"
-        elif activity_state == "busy":
-            state = "busy"
-        elif activity_state == "idle":
-            state = "idle"
         else:
-            state = "online"
+            state = _classify(data.last_seen_ts, activity_state, now_ts)
 
         friends.append({
             "uuid": uuid,
-            "name": data["name"],
+            "name": data.name,
             "state": state,
             "activity_state": activity_state,  # raw activity from client
-            "last_seen": last_seen.isoformat() + "Z",
+            "last_seen": data.last_seen_iso,  # cached at write time
         })
-    # Sort by name for consistent ordering
-    friends.sort(key=lambda f: f["name"].lower())
+    # _name_index iteration already yields consistent name ordering
     return friends
 
 
+async def _prune_stale_users():
+    """Periodically drop users whose last heartbeat is older than _PRUNE_AFTER_SECONDS.
+
+    Runs on the event loop — the single writer of the in-memory stores — so
+    it can delete entries without any locking.
+    """
+    while True:
+        await asyncio.sleep(_PRUNE_INTERVAL_SECONDS)
+        cutoff = time.time() - _PRUNE_AFTER_SECONDS
+        removed = False
+        while _last_seen_index and _last_seen_index[0][0] < cutoff:
+            _ts, uuid = _last_seen_index.pop(0)
+            entry = USER_HEARTBEATS.pop(uuid)
+            _name_index.remove((entry.name.lower(), uuid))
+            removed = True
+        if removed:
+            _invalidate_status_cache()
+
+
+@app.on_event("startup")
+async def _start_background_tasks():
+    asyncio.create_task(_prune_stale_users())
+
+
 # --- Endpoints ---
 
 @app.post("/heartbeat/", response_model=HeartbeatResponse)
-async def post_heartbeat(request: HeartbeatRequest, token: str = Depends(verify_token)):
+async def post_heartbeat(raw_request: Request, token: str = Depends(verify_token)):
     """Receive a heartbeat from a frontend client.
 
     Requires Bearer token authentication.
@@ -196,20 +499,51 @@ async def post_heartbeat(request: HeartbeatRequest, token: str = Depends(verify_
     - "idle": User is AFK (no mouse/keyboard input for 5+ minutes)
     - "unknown": Could not determine activity state
     """
-    now = datetime.utcnow()
-    USER_HEARTBEATS[request.uuid] = {
-        "name": request.name,
-        "last_seen": now,
-        "activity_state": request.activity_state,
-    }
+    request = _decode_heartbeat(await raw_request.body())
+    now_ts = time.time()
+    now_iso = datetime.utcfromtimestamp(now_ts).isoformat() + "Z"
+    if _redis is not None:
+        pipe = _redis.pipeline(transaction=False)
+        _redis_queue_heartbeat(pipe, request.uuid, request.name, request.activity_state, now_ts, now_iso)
+        await pipe.execute()
+    else:
+        _store_heartbeat(request.uuid, request.name, request.activity_state, now_ts, now_iso)
+    _invalidate_status_cache()
     return HeartbeatResponse(
         success=True,
         message=f"Heartbeat received for {request.name} (state: {request.activity_state})",
-        timestamp=now.isoformat() + "Z",
+        timestamp=now_iso,
     )
 
 
-@app.get("/online_status/", response_class=JSONResponse)
+@app.post("/heartbeat/batch/")
+async def post_heartbeat_batch(raw_request: Request, token: str = Depends(verify_token)):
+    """Receive a batch of heartbeats in a single request.
+
+    Requires Bearer token authentication.
+
+    Body: {"items": [{"uuid": ..., "name": ..., "activity_state": ...}, ...]}
+
+    Clients that track several users (or replay heartbeats buffered while
+    offline) can coalesce them here instead of paying per-request TLS/HTTP
+    overhead N times. The per-item /heartbeat/ endpoint stays unchanged.
+    """
+    items = _decode_heartbeat_batch(await raw_request.body())
+    now_ts = time.time()
+    now_iso = datetime.utcfromtimestamp(now_ts).isoformat() + "Z"
+    if _redis is not None:
+        pipe = _redis.pipeline(transaction=False)
+        for item in items:
+            _redis_queue_heartbeat(pipe, item.uuid, item.name, item.activity_state, now_ts, now_iso)
+        await pipe.execute()
+    else:
+        for item in items:
+            _store_heartbeat(item.uuid, item.name, item.activity_state, now_ts, now_iso)
+    _invalidate_status_cache()
+    return {"accepted": len(items), "timestamp": now_iso}
+
+
+@app.get("/online_status/", response_class=ORJSONResponse)
 async def get_online_status(token: str = Depends(verify_token)):
     """Return the current friend online status list.
 
@@ -218,17 +552,32 @@ async def get_online_status(token: str = Depends(verify_token)):
     When USE_MOCK_DATA is True, returns mock data with optional randomization.
     When USE_MOCK_DATA is False, returns real data based on heartbeats.
     """
-    global MOCK_FRIENDS
+    global MOCK_FRIENDS, _mock_body
 
     if USE_MOCK_DATA:
         # Mock mode: use static/randomized test data
         if RANDOMIZE_ON_FETCH:
             MOCK_FRIENDS = randomize_friends(MOCK_FRIENDS, flip_probability=FLIP_PROBABILITY, seed=RANDOM_SEED)
-        return JSONResponse(content={"friends": MOCK_FRIENDS})
+            return ORJSONResponse(content={"friends": MOCK_FRIENDS})
+        # Static mock list: zero per-request work after the first build
+        if _mock_body is None:
+            _mock_body = orjson.dumps({"friends": MOCK_FRIENDS})
+        return Response(content=_mock_body, media_type="application/json")
     else:
-        # Real mode: build list from heartbeats
-        friends = get_real_friends_list()
-        return JSONResponse(content={"friends": friends})
+        # Real mode: build list from heartbeats, caching the serialized
+        # payload for _STATUS_CACHE_TTL so concurrent polls collapse into
+        # one build per window.
+        global _status_snapshot
+        snapshot = _status_snapshot
+        now_mono = time.monotonic()
+        if now_mono >= snapshot[0]:
+            if _redis is not None:
+                friends = await _redis_friends_list()
+            else:
+                friends = get_real_friends_list()
+            snapshot = (now_mono + _STATUS_CACHE_TTL, orjson.dumps({"friends": friends}))
+            _status_snapshot = snapshot
+        return Response(content=snapshot[1], media_type="application/json")
 
 
 @app.get("/healthz")
@@ -240,33 +589,25 @@ async def healthz():
 # DEBUG / TEST ENDPOINTS (protected with token authentication)
 # =====================================================================
 
-@app.get("/debug/users", response_class=JSONResponse)
+@app.get("/debug/users", response_class=ORJSONResponse)
 async def debug_get_users(token: str = Depends(verify_token)):
     """Debug endpoint: Show all registered users and their heartbeat data."""
     users = []
-    now = datetime.utcnow()
+    now_ts = time.time()
     for uuid, data in USER_HEARTBEATS.items():
-        last_seen: datetime = data["last_seen"]
-        elapsed = (now - last_seen).total_seconds()
-        activity_state = data.get("activity_state", "online")
-
-        # Determine effective state
-        if elapsed >= ONLINE_TIMEOUT_SECONDS:
-            effective_state = "offline"
-        elif activity_state == "idle":
-            effective_state = "idle"
-        else:
-            effective_state = "online"
+        elapsed = now_ts - data.last_seen_ts
+        activity_state = data.activity_state
+        effective_state = _classify(data.last_seen_ts, activity_state, now_ts)
 
         users.append({
             "uuid": uuid,
-            "name": data["name"],
+            "name": data.name,
             "activity_state": activity_state,
             "effective_state": effective_state,
-            "last_seen": last_seen.isoformat() + "Z",
+            "last_seen": data.last_seen_iso,
             "elapsed_seconds": round(elapsed, 1),
         })
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "total_users": len(users),
         "online_timeout_seconds": ONLINE_TIMEOUT_SECONDS,
         "use_mock_data": USE_MOCK_DATA,
@@ -278,6 +619,9 @@ async def debug_get_users(token: str = Depends(verify_token)):
 async def debug_clear_users(token: str = Depends(verify_token)):
     """Debug endpoint: Clear all user heartbeat data."""
     USER_HEARTBEATS.clear()
+    _name_index.clear()
+    _last_seen_index.clear()
+    _invalidate_status_cache()
     return {"success": True, "message": "All user data cleared"}
 
 
@@ -285,9 +629,10 @@ async def debug_clear_users(token: str = Depends(verify_token)):
 async def debug_simulate_offline(uuid: str, token: str = Depends(verify_token)):
     """Debug endpoint: Simulate a user going offline by setting their last_seen to 10 minutes ago."""
     if uuid not in USER_HEARTBEATS:
-        return JSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
+        return ORJSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
 
-    USER_HEARTBEATS[uuid]["last_seen"] = datetime.utcnow() - timedelta(minutes=10)
+    _touch_last_seen(uuid, time.time() - 600)
+    _invalidate_status_cache()
     return {"success": True, "message": f"User {uuid} simulated as offline"}
 
 
@@ -295,10 +640,11 @@ async def debug_simulate_offline(uuid: str, token: str = Depends(verify_token)):
 async def debug_simulate_idle(uuid: str, token: str = Depends(verify_token)):
     """Debug endpoint: Simulate a user going idle (AFK) by setting their activity_state to idle."""
     if uuid not in USER_HEARTBEATS:
-        return JSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
+        return ORJSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
 
-    USER_HEARTBEATS[uuid]["activity_state"] = "idle"
-    USER_HEARTBEATS[uuid]["last_seen"] = datetime.utcnow()  # keep them "connected" but idle
+    USER_HEARTBEATS[uuid].activity_state = "idle"
+    _touch_last_seen(uuid, time.time())  # keep them "connected" but idle
+    _invalidate_status_cache()
     return {"success": True, "message": f"User {uuid} simulated as idle"}
 
 
@@ -306,10 +652,11 @@ async def debug_simulate_idle(uuid: str, token: str = Depends(verify_token)):
 async def debug_simulate_active(uuid: str, token: str = Depends(verify_token)):
     """Debug endpoint: Simulate a user becoming active again."""
     if uuid not in USER_HEARTBEATS:
-        return JSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
+        return ORJSONResponse(status_code=404, content={"error": f"User {uuid} not found"})
 
-    USER_HEARTBEATS[uuid]["activity_state"] = "online"
-    USER_HEARTBEATS[uuid]["last_seen"] = datetime.utcnow()
+    USER_HEARTBEATS[uuid].activity_state = "online"
+    _touch_last_seen(uuid, time.time())
+    _invalidate_status_cache()
     return {"success": True, "message": f"User {uuid} simulated as active"}
 
 
@@ -325,4 +672,21 @@ async def debug_simulate_active(uuid: str, token: str = Depends(verify_token)):
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Set RELOAD=true for the single-process auto-reloading dev server.
+    if os.environ.get("RELOAD", "false").lower() == "true":
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # Production: one worker per CPU on uvloop + httptools. Note that
+        # USER_HEARTBEATS and the status cache are per-process, so with
+        # multiple workers each worker only sees the heartbeats routed to
+        # it — a shared store (e.g. Redis) is needed for consistent
+        # multi-worker results.
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=os.cpu_count(),
+            loop="uvloop",
+            http="httptools",
+            log_level="info",
+        )
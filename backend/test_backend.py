@@ -11,6 +11,13 @@ Usage:
     # Or with custom token:
     API_TOKEN=your-token python test_backend.py
 
+    # Scripted (non-interactive): one command per line on stdin
+    printf '1\n3\n0\n' | python test_backend.py
+    python test_backend.py < script.txt
+
+    # One-shot stress run:
+    python test_backend.py --stress 500
+
 Commands:
     1. Send heartbeat for test user (online)
     2. Send heartbeat for test user (idle/AFK)
@@ -21,17 +28,36 @@ Commands:
     7. Simulate user going idle
     8. Simulate user becoming active
     9. Toggle mock mode
-    10. Add second test user
+    10. Add N test users (one batched request)
     11. Change API token
+    stress N. Fire N concurrent heartbeats
     0. Exit
 """
 
+import argparse
+import asyncio
+import concurrent.futures
+import time
+
 import requests
 import urllib3
 import uuid
 import sys
 import os
 
+# Optional perf dep: orjson decodes dict-heavy payloads a few times faster
+# than stdlib json, which shows on large /debug/users dumps.
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -47,20 +73,63 @@ API_TOKEN = os.environ.get("API_TOKEN", "e0ee13c95baad6354422ad4217db9faad743944
 TEST_UUID = str(uuid.uuid4())
 TEST_NAME = "TestUser"
 
-
-def get_headers():
-    """Get authorization headers with Bearer token."""
-    return {"Authorization": f"Bearer {API_TOKEN}"}
+# One Session for every call: keep-alive reuses the TCP/TLS connection to the
+# backend instead of paying a fresh handshake per menu action.
+#
+# Purely local runs can skip the TCP loopback stack entirely: start the
+# backend with `uvicorn main:app --uds /tmp/onlinestatus.sock` and set
+# BASE_URL=unix+http://%2Ftmp%2Fonlinestatus.sock (socket path URL-encoded).
+# Needs the optional requests_unixsocket package.
+if BASE_URL.startswith("unix+http://"):
+    try:
+        import requests_unixsocket
+    except ImportError:
+        sys.exit("BASE_URL is a unix socket URL but requests_unixsocket is not installed")
+    BASE_URL = "http+unix://" + BASE_URL[len("unix+http://"):]
+    SESSION = requests_unixsocket.Session()
+else:
+    SESSION = requests.Session()
+SESSION.verify = VERIFY_SSL
+# Retry transient failures (connection resets, 502/503/504) with a short
+# exponential backoff instead of printing an error and making the user
+# re-enter the command mid load test.
+_retry = urllib3.util.retry.Retry(
+    total=3,
+    backoff_factor=0.1,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=("GET", "POST"),
+)
+_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=16, max_retries=_retry,
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+
+# (connect, read) timeouts so a stalled backend cannot hang the REPL on a
+# blocked syscall. Override via BACKEND_TIMEOUT="connect,read" (seconds).
+_TIMEOUT = tuple(float(x) for x in os.environ.get("BACKEND_TIMEOUT", "1.0,5.0").split(","))
+
+
+def _refresh_headers():
+    """(Re)build the Authorization header on the shared session.
+
+    The only place the Bearer string is formatted; runs once at import and
+    again when the token changes, never per request.
+    """
+    SESSION.headers["Authorization"] = f"Bearer {API_TOKEN}"
+
+
+_refresh_headers()
 
 
 def send_heartbeat(user_uuid: str = TEST_UUID, name: str = TEST_NAME, activity_state: str = "online"):
     """Send a heartbeat for a user."""
     try:
-        resp = requests.post(
+        resp = SESSION.post(
             f"{BASE_URL}/heartbeat/",
             json={"uuid": user_uuid, "name": name, "activity_state": activity_state},
-            headers=get_headers(),
-            verify=VERIFY_SSL
+            timeout=_TIMEOUT,
         )
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
@@ -71,31 +140,65 @@ def send_heartbeat(user_uuid: str = TEST_UUID, name: str = TEST_NAME, activity_s
         print(f"✗ Error: {e}")
 
 
+def send_heartbeat_batch(users: list):
+    """Send many heartbeats in a single POST to /heartbeat/batch/.
+
+    Payload schema: {"items": [{"uuid": str, "name": str, "activity_state": str}, ...]}
+    One request amortizes TCP/TLS/HTTP framing over the whole list. Falls
+    back to per-user send_heartbeat calls if the server predates the batch
+    endpoint (404).
+    """
+    try:
+        resp = SESSION.post(f"{BASE_URL}/heartbeat/batch/", json={"items": users}, timeout=_TIMEOUT)
+        if resp.status_code == 401:
+            print(f"✗ Unauthorized - check your API token")
+            return
+        if resp.status_code == 404:
+            print("! No /heartbeat/batch/ on this server, sending individually")
+            for u in users:
+                send_heartbeat(u["uuid"], u["name"], u.get("activity_state", "online"))
+            return
+        resp.raise_for_status()
+        print(f"✓ Batch sent: {resp.json()}")
+    except Exception as e:
+        print(f"✗ Error: {e}")
+
+
+def send_heartbeat_raw(body: bytes):
+    """POST pre-serialized heartbeat bytes, skipping the per-call json.dumps.
+
+    Used by the stress path, where the payloads are all built up front.
+    """
+    return SESSION.post(
+        f"{BASE_URL}/heartbeat/",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        timeout=_TIMEOUT,
+    )
+
+
 def get_online_status():
     """Fetch the current online status list."""
     try:
-        resp = requests.get(f"{BASE_URL}/online_status/", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.get(f"{BASE_URL}/online_status/", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
         resp.raise_for_status()
-        data = resp.json()
+        data = _loads(resp.content)
         friends = data.get("friends", [])
-        print(f"\n{'='*50}")
-        print(f"Online Status ({len(friends)} users)")
-        print('='*50)
-        for f in friends:
-            state = f["state"]
-            if state == "online":
-                status = "🟢"
-            elif state == "idle":
-                status = "🟡"
-            else:
-                status = "🔴"
-            print(f"  {status} {f['name']} [{state}] (last seen: {f['last_seen']})")
+        # Buffer everything into one write: with hundreds of users, one
+        # syscall instead of one print (lock + flush) per line.
+        icons = {"online": "🟢", "idle": "🟡"}
+        lines = [f"\n{'='*50}", f"Online Status ({len(friends)} users)", "=" * 50]
+        lines.extend(
+            f"  {icons.get(f['state'], '🔴')} {f['name']} [{f['state']}] (last seen: {f['last_seen']})"
+            for f in friends
+        )
         if not friends:
-            print("  (no users yet)")
-        print('='*50)
+            lines.append("  (no users yet)")
+        lines.append("=" * 50)
+        sys.stdout.write("\n".join(lines) + "\n")
     except Exception as e:
         print(f"✗ Error: {e}")
 
@@ -103,34 +206,37 @@ def get_online_status():
 def debug_users():
     """Show debug info for all users."""
     try:
-        resp = requests.get(f"{BASE_URL}/debug/users", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.get(f"{BASE_URL}/debug/users", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
         resp.raise_for_status()
-        data = resp.json()
-        print(f"\n{'='*50}")
-        print(f"Debug: All Users ({data['total_users']} total)")
-        print(f"Mock mode: {data['use_mock_data']}")
-        print(f"Online timeout: {data['online_timeout_seconds']}s")
-        print('='*50)
-        for u in data["users"]:
-            state = u["effective_state"]
-            if state == "online":
-                status = "🟢 online"
-            elif state == "idle":
-                status = "🟡 idle"
-            else:
-                status = "🔴 offline"
-            print(f"  UUID: {u['uuid']}")
-            print(f"  Name: {u['name']}")
-            print(f"  Activity: {u['activity_state']}")
-            print(f"  Effective: {status}")
-            print(f"  Last seen: {u['last_seen']} ({u['elapsed_seconds']}s ago)")
-            print("  ---")
-        if not data["users"]:
-            print("  (no users)")
-        print('='*50)
+        data = _loads(resp.content)
+        users = data["users"]
+        # Buffer into one write (see get_online_status); unpack each dict
+        # once instead of re-indexing per field.
+        labels = {"online": "🟢 online", "idle": "🟡 idle"}
+        lines = [
+            f"\n{'='*50}",
+            f"Debug: All Users ({data['total_users']} total)",
+            f"Mock mode: {data['use_mock_data']}",
+            f"Online timeout: {data['online_timeout_seconds']}s",
+            "=" * 50,
+        ]
+        for u in users:
+            status = labels.get(u["effective_state"], "🔴 offline")
+            lines.append(
+                f"  UUID: {u['uuid']}\n"
+                f"  Name: {u['name']}\n"
+                f"  Activity: {u['activity_state']}\n"
+                f"  Effective: {status}\n"
+                f"  Last seen: {u['last_seen']} ({u['elapsed_seconds']}s ago)\n"
+                "  ---"
+            )
+        if not users:
+            lines.append("  (no users)")
+        lines.append("=" * 50)
+        sys.stdout.write("\n".join(lines) + "\n")
     except Exception as e:
         print(f"✗ Error: {e}")
 
@@ -138,7 +244,7 @@ def debug_users():
 def clear_users():
     """Clear all user data."""
     try:
-        resp = requests.post(f"{BASE_URL}/debug/clear_users", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.post(f"{BASE_URL}/debug/clear_users", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
@@ -151,7 +257,7 @@ def clear_users():
 def simulate_offline(user_uuid: str):
     """Simulate a user going offline."""
     try:
-        resp = requests.post(f"{BASE_URL}/debug/simulate_offline/{user_uuid}", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.post(f"{BASE_URL}/debug/simulate_offline/{user_uuid}", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
@@ -167,7 +273,7 @@ def simulate_offline(user_uuid: str):
 def simulate_idle(user_uuid: str):
     """Simulate a user going idle (AFK)."""
     try:
-        resp = requests.post(f"{BASE_URL}/debug/simulate_idle/{user_uuid}", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.post(f"{BASE_URL}/debug/simulate_idle/{user_uuid}", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
@@ -183,7 +289,7 @@ def simulate_idle(user_uuid: str):
 def simulate_active(user_uuid: str):
     """Simulate a user becoming active again."""
     try:
-        resp = requests.post(f"{BASE_URL}/debug/simulate_active/{user_uuid}", headers=get_headers(), verify=VERIFY_SSL)
+        resp = SESSION.post(f"{BASE_URL}/debug/simulate_active/{user_uuid}", timeout=_TIMEOUT)
         if resp.status_code == 401:
             print(f"✗ Unauthorized - check your API token")
             return
@@ -196,24 +302,109 @@ def simulate_active(user_uuid: str):
         print(f"✗ Error: {e}")
 
 
+# Last known use_mock_data flag, so toggling again skips the read round trip
+_MOCK_STATE = None
+
+
 def toggle_mock_mode():
-    """Toggle mock mode on/off. (DISABLED IN PRODUCTION)"""
-    print("✗ This endpoint is disabled in production")
-    return
-    # Uncomment below if endpoint is re-enabled on the server
-    # try:
-    #     # First get current state
-    #     resp = requests.get(f"{BASE_URL}/debug/users", headers=get_headers(), verify=VERIFY_SSL)
-    #     resp.raise_for_status()
-    #     current_mock = resp.json()["use_mock_data"]
-    #
-    #     # Toggle it
-    #     new_state = not current_mock
-    #     resp = requests.post(f"{BASE_URL}/debug/set_mock_mode/{str(new_state).lower()}", headers=get_headers(), verify=VERIFY_SSL)
-    #     resp.raise_for_status()
-    #     print(f"✓ Mock mode: {resp.json()['use_mock_data']}")
-    # except Exception as e:
-    #     print(f"✗ Error: {e}")
+    """Toggle mock mode on/off. (Needs /debug/set_mock_mode enabled server-side.)
+
+    Reads the current flag from the tiny /debug/mock_mode endpoint when the
+    server has one, only falling back to the full /debug/users dump (which
+    serializes every user just to carry one boolean) on 404. The flag is
+    cached so repeated toggles skip the read entirely.
+    """
+    global _MOCK_STATE
+    try:
+        if _MOCK_STATE is None:
+            resp = SESSION.get(f"{BASE_URL}/debug/mock_mode", timeout=_TIMEOUT)
+            if resp.status_code == 404:
+                resp = SESSION.get(f"{BASE_URL}/debug/users", timeout=_TIMEOUT)
+            resp.raise_for_status()
+            _MOCK_STATE = _loads(resp.content)["use_mock_data"]
+        new_state = not _MOCK_STATE
+        resp = SESSION.post(f"{BASE_URL}/debug/set_mock_mode/{str(new_state).lower()}", timeout=_TIMEOUT)
+        if resp.status_code == 404:
+            print("✗ set_mock_mode is disabled on this server")
+            return
+        resp.raise_for_status()
+        _MOCK_STATE = _loads(resp.content)["use_mock_data"]
+        print(f"✓ Mock mode: {_MOCK_STATE}")
+    except Exception as e:
+        print(f"✗ Error: {e}")
+
+
+# Shared across stress runs so repeated invocations skip the
+# /dev/urandom reads and hex formatting for ids already generated.
+_UUID_POOL = []
+
+
+def _stress_uuids(n: int):
+    """Return n hex user ids, growing the shared pool only as needed."""
+    if len(_UUID_POOL) < n:
+        gen = uuid.uuid4  # local alias: skip the attribute lookup per call
+        _UUID_POOL.extend(gen().hex for _ in range(n - len(_UUID_POOL)))
+    return _UUID_POOL[:n]
+
+
+def stress_test(n: int):
+    """Fire n concurrent heartbeats for n fresh users and report throughput.
+
+    Uses aiohttp so all n requests are genuinely in flight at once; if
+    aiohttp is not installed, falls back to a thread pool over the shared
+    Session (bounded concurrency, same effect at small n).
+
+    aiohttp was chosen over httpx with HTTP/2 here deliberately: the
+    backend is served by uvicorn, which only speaks HTTP/1.1, so h2
+    multiplexing would never negotiate, and aiohttp has less per-request
+    overhead for plain HTTP/1.1 async fan-out anyway.
+    """
+    # Serialize all payloads up front so the timed loop only moves bytes;
+    # .hex ids from the pooled generator skip UUID.__str__'s hyphen pass.
+    bodies = [
+        _dumps({"uuid": uid, "name": f"user{i}", "activity_state": "online"})
+        for i, uid in enumerate(_stress_uuids(n))
+    ]
+    started = time.perf_counter()
+    # aiohttp would need a UnixConnector for socket URLs; the threaded
+    # session path already speaks whatever transport SESSION is mounted with.
+    use_aiohttp = not BASE_URL.startswith("http+unix://")
+    if use_aiohttp:
+        try:
+            import aiohttp
+        except ImportError:
+            use_aiohttp = False
+    if not use_aiohttp:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(n, 32)) as pool:
+            results = list(pool.map(
+                lambda body: send_heartbeat_raw(body).status_code,
+                bodies,
+            ))
+    else:
+        async def _run():
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                keepalive_timeout=60,
+                ssl=None if VERIFY_SSL else False,
+            )
+            async with aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": SESSION.headers["Authorization"]},
+                timeout=aiohttp.ClientTimeout(connect=_TIMEOUT[0], sock_read=_TIMEOUT[1]),
+            ) as session:
+                async def one(body):
+                    async with session.post(
+                        f"{BASE_URL}/heartbeat/",
+                        data=body,
+                        headers={"Content-Type": "application/json"},
+                    ) as resp:
+                        return resp.status
+                return await asyncio.gather(*(one(body) for body in bodies))
+
+        results = asyncio.run(_run())
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for s in results if s == 200)
+    print(f"✓ {ok}/{n} heartbeats ok in {elapsed:.2f}s ({n / elapsed:.0f} req/s)")
 
 
 def change_token():
@@ -222,13 +413,82 @@ def change_token():
     new_token = input("Enter new API token: ").strip()
     if new_token:
         API_TOKEN = new_token
+        _refresh_headers()
         print(f"✓ Token updated")
     else:
         print("✗ Token not changed (empty input)")
 
 
-def main():
-    print(f"""
+def _add_users(choice):
+    """Add extra users in one batched request. Accepts "10 N" inline
+    (script-friendly) or prompts when run interactively."""
+    parts = choice.split()
+    try:
+        if len(parts) > 1:
+            n = int(parts[1])
+        else:
+            n = int(input("How many users [1]: ").strip() or "1")
+    except ValueError:
+        print("Invalid number")
+        return
+    send_heartbeat_batch([
+        {"uuid": str(uuid.uuid4()), "name": f"user{i}", "activity_state": "online"}
+        for i in range(n)
+    ])
+
+
+def _stress(choice):
+    try:
+        n = int(choice.split()[1])
+    except (IndexError, ValueError):
+        print("Usage: stress N")
+    else:
+        stress_test(n)
+
+
+# O(1) dict lookup instead of a chain of string comparisons — matters once
+# the scripted mode pipes thousands of commands through _dispatch.
+ACTIONS = {
+    "1": lambda: send_heartbeat(activity_state="online"),
+    "2": lambda: send_heartbeat(activity_state="idle"),
+    "3": get_online_status,
+    "4": debug_users,
+    "5": clear_users,
+    "6": lambda: simulate_offline(TEST_UUID),
+    "7": lambda: simulate_idle(TEST_UUID),
+    "8": lambda: simulate_active(TEST_UUID),
+    "9": toggle_mock_mode,
+    "11": change_token,
+}
+
+# Commands that take arguments are keyed by their first word.
+_ACTIONS_WITH_ARGS = {
+    "10": _add_users,
+    "stress": _stress,
+}
+
+
+def _dispatch(choice):
+    """Run one menu command. Returns False when the caller should exit."""
+    if choice == "0":
+        print("Bye!")
+        SESSION.close()
+        return False
+    fn = ACTIONS.get(choice)
+    if fn is not None:
+        fn()
+        return True
+    fn = _ACTIONS_WITH_ARGS.get(choice.split()[0])
+    if fn is not None:
+        fn(choice)
+    else:
+        print("Invalid choice")
+    return True
+
+
+# Rendered once at import time; the REPL re-emits the menu on every
+# iteration, so one buffered write beats a dozen print() calls.
+_BANNER_STR = f"""
 ╔══════════════════════════════════════════════════╗
 ║         Online Status Backend Tester             ║
 ╠══════════════════════════════════════════════════╣
@@ -242,64 +502,69 @@ AFK Detection Logic:
   - Windows: GetLastInputInfo (mouse/keyboard idle time)
   - Linux: X11 XScreenSaver Extension
   - Threshold: 5 minutes of no input = idle/AFK
-  
+
 States:
   🟢 online  = Active (recent input)
   🟡 idle    = AFK (no input for 5+ min, but still connected)
   🔴 offline = Disconnected (no heartbeat for 5+ min)
-  
+
 Authentication:
   All /heartbeat/ and /online_status/ endpoints require Bearer token.
   Debug endpoints (/debug/*) do not require authentication.
-""")
+"""
+
+_MENU_STR = """
+Commands:
+  1. Send heartbeat (online/active)
+  2. Send heartbeat (idle/AFK)
+  3. Get online status
+  4. Show all users (debug)
+  5. Clear all users
+  6. Simulate test user going offline
+  7. Simulate test user going idle
+  8. Simulate test user becoming active
+  9. Toggle mock mode
+  10. Add N test users (one batched request)
+  11. Change API token
+  stress N. Fire N concurrent heartbeats
+  0. Exit
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online Status backend tester")
+    parser.add_argument("--stress", type=int, metavar="N",
+                        help="fire N concurrent heartbeats and exit")
+    args = parser.parse_args()
+
+    if args.stress is not None:
+        stress_test(args.stress)
+        SESSION.close()
+        return
+
+    if not sys.stdin.isatty():
+        # Non-interactive: read the whole script in one burst and run each
+        # line through the same dispatch as the REPL (python test_backend.py < script.txt).
+        for line in sys.stdin.read().splitlines():
+            choice = line.strip()
+            if not choice or choice.startswith("#"):
+                continue
+            if not _dispatch(choice):
+                return
+        SESSION.close()
+        return
+
+    sys.stdout.write(_BANNER_STR)
 
     while True:
-        print("\nCommands:")
-        print("  1. Send heartbeat (online/active)")
-        print("  2. Send heartbeat (idle/AFK)")
-        print("  3. Get online status")
-        print("  4. Show all users (debug)")
-        print("  5. Clear all users")
-        print("  6. Simulate test user going offline")
-        print("  7. Simulate test user going idle")
-        print("  8. Simulate test user becoming active")
-        print("  9. Toggle mock mode")
-        print("  10. Add second test user")
-        print("  11. Change API token")
-        print("  0. Exit")
+        sys.stdout.write(_MENU_STR)
 
         choice = input("\nChoice: ").strip()
 
-        if choice == "1":
-            send_heartbeat(activity_state="online")
-        elif choice == "2":
-            send_heartbeat(activity_state="idle")
-        elif choice == "3":
-            get_online_status()
-        elif choice == "4":
-            debug_users()
-        elif choice == "5":
-            clear_users()
-        elif choice == "6":
-            simulate_offline(TEST_UUID)
-        elif choice == "7":
-            simulate_idle(TEST_UUID)
-        elif choice == "8":
-            simulate_active(TEST_UUID)
-        elif choice == "9":
-            toggle_mock_mode()
-        elif choice == "10":
-            # Add a second user
-            second_uuid = str(uuid.uuid4())
-            send_heartbeat(second_uuid, "SecondUser", "online")
-            print(f"  (UUID: {second_uuid[:8]}...)")
-        elif choice == "11":
-            change_token()
-        elif choice == "0":
-            print("Bye!")
+        if not choice:
+            continue
+        if not _dispatch(choice):
             sys.exit(0)
-        else:
-            print("Invalid choice")
 
 
 if __name__ == "__main__":